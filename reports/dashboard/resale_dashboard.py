@@ -3,12 +3,12 @@ from dash import dcc, html, Input, Output, callback
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-import geopandas as gpd
 
-from src.config import PROCESSED_DATA_DIR, EXTERNAL_DATA_DIR
+from src.config import PROCESSED_DATA_DIR
+from src.utils.bitmaps import BitmapIndex
+from src.utils.logging import setup_logger, timed
 
-# Import geojson file
-town_geo = gpd.read_file(EXTERNAL_DATA_DIR / 'district_and_planning_area.geojson')
+setup_logger()
 
 # Import and load cleaned data
 filename = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv'
@@ -31,6 +31,19 @@ df_p['start_floor_binned'] = df_p['start_floor'].apply(lambda a: bin_numbers(a,
 df_p['quarter'] = df_p['month'].apply(lambda a: bin_numbers(a, 1, 3))
 df_p['quarter'] = df_p['quarter'].replace({'1-3': 'Q1', '4-6': 'Q2', '7-9': 'Q3', '10-12': 'Q4',})
 
+# Precompute row bitmaps for the cross-filter panel
+FILTER_COLUMNS = ['town', 'region', 'flat_type', 'flat_model']
+bitmaps = BitmapIndex(df_p, FILTER_COLUMNS, ranges=['year'])
+YEAR_MIN, YEAR_MAX = int(df_p['year'].min()), int(df_p['year'].max())
+
+def filter_rows(towns, regions, flat_types, flat_models, years):
+    # Combine the filter bitmaps first so grouping only touches the selected rows
+    rows = bitmaps.select(
+        values=dict(zip(FILTER_COLUMNS, [towns, regions, flat_types, flat_models])),
+        ranges={'year': years},
+    )
+    return df_p if rows is None else df_p.take(rows)
+
 
 import dash
 from dash import dcc, html, Input, Output, callback
@@ -72,7 +85,8 @@ SIDEBAR_STYLE = {
     "width": "16rem",
     "padding": "2rem 1rem",
     "backgroundColor": "#f8f9fa",
-    "borderRight": "1px solid #dee2e6"
+    "borderRight": "1px solid #dee2e6",
+    "overflowY": "auto"
 }
 
 # Main content style
@@ -107,9 +121,35 @@ sidebar = html.Div([
     html.Div([
         html.A("Units Resold", id="units-link", style=NAV_LINK_ACTIVE_STYLE),
         html.A("Mean Resale Price", id="price-link", style=NAV_LINK_STYLE),
-    ], id="nav-links")
+    ], id="nav-links"),
+    html.Hr(),
+    html.P("Filters", className="lead", style={"fontSize": "1rem", "marginBottom": "1rem"}),
+    html.Div([
+        html.Div([
+            html.Label(label, style={'fontWeight': 'bold', 'fontSize': '0.85rem'}),
+            dcc.Dropdown(
+                id=f'filter-{col}',
+                options=sorted(df_p[col].dropna().unique()),
+                multi=True,
+                placeholder='All',
+            )
+        ], style={'marginBottom': 10})
+        for col, label in zip(FILTER_COLUMNS, ['Town', 'Region', 'Flat Type', 'Flat Model'])
+    ]),
+    html.Label("Year", style={'fontWeight': 'bold', 'fontSize': '0.85rem'}),
+    dcc.RangeSlider(
+        id='filter-year',
+        min=YEAR_MIN,
+        max=YEAR_MAX,
+        step=1,
+        value=[YEAR_MIN, YEAR_MAX],
+        marks={y: str(y) for y in range(YEAR_MIN, YEAR_MAX + 1, 10)},
+        tooltip={'placement': 'bottom'},
+    ),
 ], style=SIDEBAR_STYLE)
 
+FILTER_INPUTS = [Input(f'filter-{col}', 'value') for col in [*FILTER_COLUMNS, 'year']]
+
 # Main content area
 content = html.Div(id="page-content", style=CONTENT_STYLE)
 
@@ -198,9 +238,13 @@ price_layout = html.Div([
 @callback(
     Output('units-resold-graph', 'figure'),
     [Input('units-group-dropdown', 'value'),
-     Input('units-x-axis-dropdown', 'value')]
+     Input('units-x-axis-dropdown', 'value'),
+     *FILTER_INPUTS]
 )
-def update_units_graph(group_var, x_var):
+@timed("dashboard.update_units_graph")
+def update_units_graph(group_var, x_var, towns, regions, flat_types, flat_models, years):
+    df_f = filter_rows(towns, regions, flat_types, flat_models, years)
+
     # Create subplot figure
     fig = make_subplots(
         rows=2, cols=1, 
@@ -210,7 +254,7 @@ def update_units_graph(group_var, x_var):
     )
     
     # Group data by x_var and group_var
-    df_plot = df_p.groupby([x_var, group_var]).size().reset_index(name='units_resold')
+    df_plot = df_f.groupby([x_var, group_var]).size().reset_index(name='units_resold')
     
     # Add traces for each group
     for g in sorted(df_plot[group_var].unique()):
@@ -225,7 +269,7 @@ def update_units_graph(group_var, x_var):
         ), row=1, col=1)
     
     # Add total units resold trace
-    df_plot_all = df_p.groupby(x_var).size().reset_index(name='units_resold')
+    df_plot_all = df_f.groupby(x_var).size().reset_index(name='units_resold')
     fig.add_trace(go.Scatter(
         x=df_plot_all[x_var],
         y=df_plot_all['units_resold'],
@@ -261,9 +305,13 @@ def update_units_graph(group_var, x_var):
 @callback(
     Output('mean-price-graph', 'figure'),
     [Input('price-group-dropdown', 'value'),
-     Input('price-x-axis-dropdown', 'value')]
+     Input('price-x-axis-dropdown', 'value'),
+     *FILTER_INPUTS]
 )
-def update_price_graph(group_var, x_var):
+@timed("dashboard.update_price_graph")
+def update_price_graph(group_var, x_var, towns, regions, flat_types, flat_models, years):
+    df_f = filter_rows(towns, regions, flat_types, flat_models, years)
+
     # Create subplot figure
     fig = make_subplots(
         rows=2, cols=1, 
@@ -273,7 +321,7 @@ def update_price_graph(group_var, x_var):
     )
     
     # Group data by x_var and group_var
-    df_plot = df_p.groupby([x_var, group_var])['infl_adj_price'].mean().reset_index()
+    df_plot = df_f.groupby([x_var, group_var])['infl_adj_price'].mean().reset_index()
     
     # Add traces for each group
     for g in sorted(df_plot[group_var].unique()):
@@ -288,7 +336,7 @@ def update_price_graph(group_var, x_var):
         ), row=1, col=1)
     
     # Add overall mean price trace
-    df_plot_all = df_p.groupby(x_var)['infl_adj_price'].mean().reset_index()
+    df_plot_all = df_f.groupby(x_var)['infl_adj_price'].mean().reset_index()
     fig.add_trace(go.Scatter(
         x=df_plot_all[x_var],
         y=df_plot_all['infl_adj_price'],
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from datetime import date as date_type
+from pathlib import Path
+import pickle
+import time
+from typing import Annotated
+
+from loguru import logger
+import typer
+
+from src.config import MODELS_DIR, PROCESSED_DATA_DIR
+from src.utils.lazy import lazy_import
+from src.utils.logging import log_metric, setup_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+app = typer.Typer()
+
+PARTITION_COLS = ['town', 'flat_type']
+FEATURE_COLS = ['floor_area_sqm', 'start_floor', 'lease_year', 'date']
+
+
+def _raw_features(df: pd.DataFrame) -> np.ndarray:
+    '''Feature matrix with the date expressed as a month number'''
+    dates = pd.to_datetime(df['date'])
+    months = dates.dt.year * 12 + dates.dt.month - 1
+    return np.column_stack([
+        df['floor_area_sqm'].to_numpy(dtype=float),
+        df['start_floor'].to_numpy(dtype=float),
+        df['lease_year'].to_numpy(dtype=float),
+        months.to_numpy(dtype=float),
+    ])
+
+
+def _to_records(df: pd.DataFrame) -> np.ndarray:
+    '''Rows as a structured array, with text columns as fixed-width strings so the
+    array can be saved as .npy and memory-mapped'''
+    arrays = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind not in 'biufmM':
+            values = df[col].fillna('').astype(str).to_numpy(dtype=str)
+        arrays[str(col)] = values
+    records = np.empty(len(df), dtype=[(col, values.dtype) for col, values in arrays.items()])
+    for col, values in arrays.items():
+        records[col] = values
+    return records
+
+
+def _rows_path(index_path: Path) -> Path:
+    return index_path.with_suffix('.rows.npy')
+
+
+def build_index(df: pd.DataFrame, weights: dict[str, float] | None = None) -> dict:
+    '''Builds one KD-tree per town and flat type over standardised features.
+
+    Features are scaled by their mean and standard deviation over the whole
+    dataset, then multiplied by `weights` (default 1 for every column) so that
+    distances are comparable across partitions. The transactions are kept as a
+    structured array under 'rows'.
+    '''
+    from scipy.spatial import cKDTree
+
+    df = df.reset_index(drop=True)
+    values = _raw_features(df)
+    mean, std = values.mean(axis=0), values.std(axis=0)
+    std[std == 0] = 1
+    w = np.array([(weights or {}).get(col, 1.0) for col in FEATURE_COLS])
+    scaled = (values - mean) / std * w
+
+    partitions = {}
+    for key, positions in df.groupby(PARTITION_COLS, sort=True).indices.items():
+        partitions[key] = (cKDTree(scaled[positions]), positions)
+
+    return {'mean': mean, 'std': std, 'weights': w, 'partitions': partitions, 'rows': _to_records(df)}
+
+
+def save_index(index: dict, index_path: Path):
+    '''Pickles the trees and writes the transactions to a separate .rows.npy file'''
+    np.save(_rows_path(index_path), index['rows'])
+    with open(index_path, 'wb') as f:
+        pickle.dump({k: v for k, v in index.items() if k != 'rows'}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_index(index_path: Path) -> dict:
+    '''Loads the trees; the transactions are memory-mapped, so only matched rows are read'''
+    with open(index_path, 'rb') as f:
+        index = pickle.load(f)
+    index['rows'] = np.load(_rows_path(index_path), mmap_mode='r')
+    return index
+
+
+def query_batch(index: dict, queries: pd.DataFrame, k: int = 10) -> pd.DataFrame:
+    '''Returns the `k` nearest transactions for every query row.
+
+    Queries need the PARTITION_COLS and FEATURE_COLS columns; a missing date means
+    today, and rows missing any other feature are skipped with a warning. Queries
+    are grouped by partition so each tree is searched once for all its queries. The
+    result has one row per match with `query_id` (the query's position in
+    `queries`), `rank` and `distance`, followed by the matched transaction's columns.
+    '''
+    queries = queries.reset_index(drop=True)
+    if 'date' not in queries:
+        queries = queries.assign(date=pd.NaT)
+    queries['date'] = pd.to_datetime(queries['date']).fillna(pd.Timestamp(date_type.today()))
+    scaled = (_raw_features(queries) - index['mean']) / index['std'] * index['weights']
+
+    finite = np.isfinite(scaled).all(axis=1)
+    if not finite.all():
+        bad_ids = np.flatnonzero(~finite).tolist()
+        shown = ', '.join(map(str, bad_ids[:20])) + (', ...' if len(bad_ids) > 20 else '')
+        logger.warning(f"Skipping {len(bad_ids)} queries with missing features: query_id {shown}.")
+
+    frames = []
+    for key, query_ids in queries.groupby(PARTITION_COLS, sort=False).indices.items():
+        if key not in index['partitions']:
+            logger.warning(f"No transactions indexed for {key}.")
+            continue
+        query_ids = query_ids[finite[query_ids]]
+        if len(query_ids) == 0:
+            continue
+        tree, positions = index['partitions'][key]
+        k_part = min(k, tree.n)
+        dist, idx = tree.query(scaled[query_ids], k=k_part)
+        dist, idx = dist.reshape(len(query_ids), k_part), idx.reshape(len(query_ids), k_part)
+
+        matches = pd.DataFrame(index['rows'][positions[idx.ravel()]])
+        matches.insert(0, 'distance', dist.ravel())
+        matches.insert(0, 'rank', np.tile(np.arange(1, k_part + 1), len(query_ids)))
+        matches.insert(0, 'query_id', np.repeat(query_ids, k_part))
+        frames.append(matches)
+
+    if not frames:
+        return pd.DataFrame(columns=['query_id', 'rank', 'distance', *index['rows'].dtype.names])
+    return pd.concat(frames, ignore_index=True).sort_values(['query_id', 'rank'], ignore_index=True)
+
+
+def query(
+    index: dict,
+    town: str,
+    flat_type: str,
+    floor_area_sqm: float,
+    start_floor: int,
+    lease_year: int,
+    date: str | None = None,
+    k: int = 10,
+) -> pd.DataFrame:
+    '''Returns the `k` nearest transactions to a single flat'''
+    q = pd.DataFrame([{
+        'town': town, 'flat_type': flat_type, 'floor_area_sqm': floor_area_sqm,
+        'start_floor': start_floor, 'lease_year': lease_year, 'date': date,
+    }])
+    return query_batch(index, q, k).drop(columns='query_id')
+
+
+@app.command()
+def build(
+    input_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    index_path: Path = MODELS_DIR / 'comparables.pkl',
+):
+    '''Builds the comparable-sales index from the processed dataset'''
+    setup_logger()
+    logger.info("Building comparables index...")
+    df = pd.read_csv(input_path, parse_dates=['date'])
+    index = build_index(df)
+    save_index(index, index_path)
+    logger.success(f"Indexed {len(df)} transactions in {len(index['partitions'])} partitions: {index_path}")
+
+
+@app.command(name='query')
+def query_command(
+    town: str = typer.Option(None),
+    flat_type: str = typer.Option(None),
+    floor_area_sqm: float = typer.Option(None),
+    start_floor: int = typer.Option(None),
+    lease_year: int = typer.Option(None),
+    date: str = typer.Option(None, help="Transaction month, e.g. 2024-06 (defaults to today)"),
+    k: int = 10,
+    batch_path: Annotated[
+        Path | None, typer.Option(help="CSV of queries to run instead of a single flat")
+    ] = None,
+    output_path: Annotated[
+        Path | None, typer.Option(help="Write matches to CSV instead of printing them")
+    ] = None,
+    index_path: Path = MODELS_DIR / 'comparables.pkl',
+):
+    '''Finds the K most similar transactions for one flat or a CSV of flats'''
+    setup_logger()
+    start = time.perf_counter()
+    index = load_index(index_path)
+    logger.info(f"Loaded index in {(time.perf_counter() - start) * 1000:.1f} ms.")
+
+    start = time.perf_counter()
+    if batch_path is not None:
+        queries = pd.read_csv(batch_path)
+        result = query_batch(index, queries, k)
+        n_queries = len(queries)
+    else:
+        required = {'town': town, 'flat_type': flat_type, 'floor_area_sqm': floor_area_sqm,
+                    'start_floor': start_floor, 'lease_year': lease_year}
+        missing = [name for name, value in required.items() if value is None]
+        if missing:
+            raise typer.BadParameter(f"Missing options for a single query: {', '.join(missing)}")
+        result = query(index, town, flat_type, floor_area_sqm, start_floor, lease_year, date, k)
+        n_queries = 1
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Answered {n_queries} queries in {elapsed_ms:.1f} ms.")
+    log_metric("comparables.query", round(elapsed_ms, 3), "timing_ms", n_queries=n_queries, k=k)
+
+    if output_path is not None:
+        result.to_csv(output_path, index=False)
+        logger.success(f"Matches saved to: {output_path}")
+    else:
+        typer.echo(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from loguru import logger
+import typer
+
+from src.config import PROCESSED_DATA_DIR
+from src.utils.lazy import lazy_import
+from src.utils.logging import setup_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+app = typer.Typer()
+
+SEGMENT_COLS = ['town', 'flat_type', 'year']
+
+# Lease ages are fitted as u = (years_leased - AGE_CENTRE) / AGE_SCALE; raw ages
+# make X'X too badly conditioned for segments with a narrow age range
+AGE_CENTRE = 50.0
+AGE_SCALE = 10.0
+
+
+def segment_sums(df: pd.DataFrame, value_col='infl_adj_price', degree: int = 2, keys=SEGMENT_COLS) -> pd.DataFrame:
+    '''Sufficient statistics for a polynomial fit of log price per sqm on years_leased.
+
+    For each segment this is n, sum(u^k) for k <= 2 * degree, sum(u^k * y) for
+    k <= degree and sum(y^2), where u is years_leased centred on AGE_CENTRE and
+    scaled by AGE_SCALE, and y is log price per sqm. These are all the normal
+    equations need, and they come out of a single grouped sum over the whole dataset.
+    '''
+    t = (df['years_leased'].to_numpy(dtype=float) - AGE_CENTRE) / AGE_SCALE
+    y = np.log(df[value_col].to_numpy(dtype=float) / df['floor_area_sqm'].to_numpy(dtype=float))
+    terms = {f't{k}': t ** k for k in range(2 * degree + 1)}
+    terms |= {f'ty{k}': t ** k * y for k in range(degree + 1)}
+    terms['yy'] = y * y
+    return pd.DataFrame(terms, index=df.index).groupby([df[k] for k in keys], observed=True).sum()
+
+
+def fit_curves(sums: pd.DataFrame, degree: int = 2, min_obs: int = 30) -> pd.DataFrame:
+    '''Solves every segment's least-squares fit in one batched call.
+
+    The (segment, p, p) stack of X'X matrices is assembled from the power sums
+    (X'X[i, j] = sum(u^(i+j))) and solved against X'y with one np.linalg.solve.
+    Returns b0..b{degree} (log price per sqm = b0 + b1*u + b2*u^2 + ..., with u the
+    scaled lease age from segment_sums), r2 and rmse per segment. Segments with
+    fewer than `min_obs` sales or too few distinct lease ages to identify the curve
+    are left as NaN.
+    '''
+    p = degree + 1
+    power_sums = sums[[f't{k}' for k in range(2 * degree + 1)]].to_numpy()
+    xty = sums[[f'ty{k}' for k in range(p)]].to_numpy()
+    yy = sums['yy'].to_numpy()
+    n = power_sums[:, 0]
+    xtx = power_sums[:, np.add.outer(np.arange(p), np.arange(p))]
+
+    ok = n >= min_obs
+    beta = np.full((len(sums), p), np.nan)
+    if ok.any():
+        ok[ok] = np.linalg.cond(xtx[ok]) < 1e12
+        beta[ok] = np.linalg.solve(xtx[ok], xty[ok][..., None])[..., 0]
+
+    # Residual and total sums of squares from the same statistics
+    sse = yy - 2 * (beta * xty).sum(axis=1) + np.einsum('si,sij,sj->s', beta, xtx, beta)
+    sst = yy - xty[:, 0] ** 2 / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2 = 1 - sse / sst
+        rmse = np.sqrt(np.clip(sse, 0, None) / n)
+
+    params = pd.DataFrame(beta, index=sums.index, columns=[f'b{k}' for k in range(p)])
+    params.insert(0, 'n_obs', n.astype(int))
+    params['r2'] = r2
+    params['rmse'] = rmse
+    return params
+
+
+def fit_lease_decay(
+    df: pd.DataFrame,
+    value_col='infl_adj_price',
+    degree: int = 2,
+    min_obs: int = 30,
+    keys=SEGMENT_COLS,
+) -> pd.DataFrame:
+    '''Fits lease-decay curves for every segment and returns the parameter table'''
+    params = fit_curves(segment_sums(df, value_col, degree, keys), degree, min_obs)
+    age_range = df.groupby(keys, observed=True)['years_leased'].agg(['min', 'max'])
+    params = params.join(age_range.rename(columns=lambda c: f'{c}_years_leased'))
+    params['age_centre'] = AGE_CENTRE
+    params['age_scale'] = AGE_SCALE
+    return params.reset_index()
+
+
+def lease_decay_curve(params: pd.DataFrame, step: int = 1) -> pd.DataFrame:
+    '''Evaluates fitted curves as price per sqm over each segment's observed lease ages.
+
+    Takes the table written by the lease_decay command, whose coefficients apply to
+    (years_leased - age_centre) / age_scale; the result has one row per segment and
+    years_leased value, ready to plot.
+    '''
+    coef_cols = [c for c in params.columns if c.startswith('b') and c[1:].isdigit()]
+    params = params.dropna(subset=coef_cols)
+    lo = params['min_years_leased'].to_numpy(dtype=int)
+    hi = params['max_years_leased'].to_numpy(dtype=int)
+    counts = (hi - lo) // step + 1
+
+    rows = np.repeat(np.arange(len(params)), counts)
+    t = lo[rows] + step * (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    u = (t - params['age_centre'].to_numpy()[rows]) / params['age_scale'].to_numpy()[rows]
+    coefs = params[coef_cols].to_numpy()[rows]
+    log_ppsqm = (coefs * u[:, None] ** np.arange(len(coef_cols))).sum(axis=1)
+
+    curve = params.drop(columns=[*coef_cols, 'age_centre', 'age_scale']).iloc[rows].reset_index(drop=True)
+    curve['years_leased'] = t
+    curve['price_per_sqm'] = np.exp(log_ppsqm)
+    return curve
+
+
+@app.command()
+def main(
+    input_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    output_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-LeaseDecay.csv',
+    value_col: str = 'infl_adj_price',
+    degree: int = 2,
+    min_obs: int = 30,
+    drop_outliers: bool = True,
+):
+    '''Fits lease-decay curves (price per sqm against years leased) per town, flat type and year'''
+    setup_logger()
+    df = pd.read_csv(input_path)
+    if drop_outliers and 'is_outlier' in df:
+        df = df[~df['is_outlier']]
+
+    logger.info("Fitting lease-decay curves...")
+    params = fit_lease_decay(df, value_col, degree, min_obs)
+    logger.info(f"Fitted {params['b0'].notna().sum()} of {len(params)} segments.")
+
+    params.to_csv(output_path, index=False)
+    logger.success(f"Lease-decay parameters saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    app()
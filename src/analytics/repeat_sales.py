@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+
+from loguru import logger
+import typer
+
+from src.config import PROCESSED_DATA_DIR
+from src.utils.lazy import lazy_import
+from src.utils.logging import setup_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+app = typer.Typer()
+
+# storey_range is stored as start_floor and storey_count in the processed data
+UNIT_COLS = ['town', 'street_name', 'block', 'flat_type', 'start_floor', 'storey_count']
+SEGMENT_COLS = ['town', 'flat_type']
+
+
+def load_sales(processed_path: Path, location_path: Path) -> pd.DataFrame:
+    '''Joins the processed dataset with the street and block columns from the location file'''
+    df = pd.read_csv(processed_path, parse_dates=['date'])
+    loc = pd.read_csv(location_path, usecols=['street_name', 'block'], dtype=str)
+
+    # dataset.main writes both files from the same frame, so rows line up by position
+    if len(loc) != len(df):
+        raise ValueError(f"{location_path} has {len(loc)} rows but {processed_path} has {len(df)}")
+    return pd.concat([df, loc], axis=1)
+
+
+def pair_sales(df: pd.DataFrame, value_col='resale_price', period_months: int = 3) -> pd.DataFrame:
+    '''Pairs each sale of a unit with the next sale of the same unit.
+
+    Units are identified by UNIT_COLS. Sales are numbered within each unit and then
+    hash joined on (unit_id, seq) = (unit_id, seq + 1), so only consecutive sales are
+    paired. Returns one row per pair with the two periods and the log price change.
+    '''
+    sales = df[[*UNIT_COLS, 'date', value_col]].dropna()
+    sales = sales[sales[value_col] > 0]
+    months = sales['date'].dt.year * 12 + sales['date'].dt.month - 1
+    sales = pd.DataFrame({
+        'unit_id': sales.groupby(UNIT_COLS, sort=False).ngroup(),
+        'period': months // period_months,
+        'log_price': np.log(sales[value_col]),
+        **{col: sales[col] for col in SEGMENT_COLS},
+    })
+    sales = sales.sort_values(['unit_id', 'period'], kind='stable')
+    sales['seq'] = sales.groupby('unit_id').cumcount()
+
+    second = sales[['unit_id', 'seq', 'period', 'log_price']].copy()
+    second['seq'] -= 1
+    pairs = sales.merge(second, on=['unit_id', 'seq'], suffixes=('_0', '_1'))
+    pairs['log_return'] = pairs['log_price_1'] - pairs['log_price_0']
+    return pairs[[*SEGMENT_COLS, 'unit_id', 'period_0', 'period_1', 'log_return']]
+
+
+def filter_pairs(pairs: pd.DataFrame, period_months: int = 3, max_annual_log_return: float = 0.4) -> pd.DataFrame:
+    '''Quality control: drops same-period resales and implausible annualised returns'''
+    gap = pairs['period_1'] - pairs['period_0']
+    years = gap * period_months / 12
+    ok = (gap > 0) & (pairs['log_return'].abs() <= max_annual_log_return * years.clip(lower=1))
+    return pairs[ok]
+
+
+def solve_index(
+    p0: np.ndarray,
+    p1: np.ndarray,
+    y: np.ndarray,
+    n_periods: int,
+    holding: np.ndarray,
+    weighted: bool = True,
+) -> np.ndarray:
+    '''Solves the repeat-sales regression for one segment.
+
+    `p0` and `p1` are column codes of the first and second sale. Each pair
+    contributes a row with -1 in its first-sale column and +1 in its second-sale
+    column; column 0 is the base and is dropped. With `weighted`, the Case-Shiller
+    second stage regresses squared residuals on `holding`, the number of calendar
+    periods between the two sales, and the model is re-solved with
+    inverse-variance weights.
+    Returns log index levels for all periods, with the base period at 0.
+    '''
+    from scipy import sparse
+    from scipy.sparse.linalg import lsqr
+
+    n = len(y)
+    rows = np.repeat(np.arange(n), 2)
+    cols = np.column_stack([p0, p1]).ravel() - 1
+    vals = np.tile([-1.0, 1.0], n)
+    keep = cols >= 0
+    X = sparse.csr_matrix((vals[keep], (rows[keep], cols[keep])), shape=(n, n_periods - 1))
+    beta = lsqr(X, y)[0]
+
+    if weighted:
+        resid = y - X @ beta
+        A = np.column_stack([np.ones(n), holding])
+        coef, *_ = np.linalg.lstsq(A, resid ** 2, rcond=None)
+        var = np.clip(A @ coef, np.mean(resid ** 2) * 0.1 + 1e-12, None)
+        w = 1 / np.sqrt(var)
+        beta = lsqr(sparse.diags(w) @ X, w * y, x0=beta)[0]
+    return np.concatenate([[0.0], beta])
+
+
+def _solve_segment(task):
+    p0, p1, y, n_periods, holding, weighted = task
+    return solve_index(p0, p1, y, n_periods, holding, weighted)
+
+
+def build_index(
+    pairs: pd.DataFrame,
+    period_months: int = 3,
+    min_pairs: int = 30,
+    weighted: bool = True,
+    n_jobs: int | None = None,
+) -> pd.DataFrame:
+    '''Builds a repeat-sales index per town and flat type, solving segments in parallel.
+
+    Returns one row per segment and period with the index (base period = 100) and
+    the number of pairs with a sale in that period.
+    '''
+    keys, tasks, periods = [], [], []
+    for key, seg in pairs.groupby(SEGMENT_COLS, sort=True):
+        if len(seg) < min_pairs:
+            continue
+        # Only periods with sales get a column, so the base is the segment's first sale
+        seg_periods, codes = np.unique(seg[['period_0', 'period_1']].to_numpy(), return_inverse=True)
+        codes = codes.reshape(-1, 2)
+        keys.append(key)
+        periods.append(seg_periods)
+        # Codes index design-matrix columns; the holding period uses the real periods
+        holding = seg_periods[codes[:, 1]] - seg_periods[codes[:, 0]]
+        tasks.append((codes[:, 0], codes[:, 1], seg['log_return'].to_numpy(), len(seg_periods), holding, weighted))
+
+    if not tasks:
+        return pd.DataFrame(columns=[*SEGMENT_COLS, 'period', 'index', 'n_pairs'])
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1:
+        results = list(map(_solve_segment, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_solve_segment, tasks, chunksize=max(1, len(tasks) // (n_jobs * 4))))
+
+    frames = []
+    for key, seg_periods, task, log_index in zip(keys, periods, tasks, results):
+        p0, p1, n_periods = task[0], task[1], task[3]
+        months = seg_periods * period_months
+        frames.append(pd.DataFrame({
+            **dict(zip(SEGMENT_COLS, key)),
+            'period': pd.to_datetime({'year': months // 12, 'month': months % 12 + 1, 'day': 1}),
+            'index': 100 * np.exp(log_index),
+            'n_pairs': np.bincount(p0, minlength=n_periods) + np.bincount(p1, minlength=n_periods),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+@app.command()
+def main(
+    processed_data: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    location_data: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Locations.csv',
+    output_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-RepeatSalesIndex.csv',
+    value_col: str = 'resale_price',
+    period_months: int = 3,
+    max_annual_log_return: float = 0.4,
+    min_pairs: int = 30,
+    weighted: bool = True,
+    n_jobs: int = typer.Option(None, help="Worker processes (defaults to all cores)"),
+):
+    '''Builds a repeat-sales price index for every town and flat type'''
+    setup_logger()
+    logger.info("Pairing repeat sales...")
+    pairs = pair_sales(load_sales(processed_data, location_data), value_col, period_months)
+    n_raw = len(pairs)
+    pairs = filter_pairs(pairs, period_months, max_annual_log_return)
+    logger.info(f"Kept {len(pairs)} of {n_raw} repeat-sale pairs after quality filters.")
+
+    index = build_index(pairs, period_months, min_pairs, weighted, n_jobs)
+    n_segments = index[SEGMENT_COLS].drop_duplicates().shape[0]
+    if n_segments == 0:
+        logger.warning(f"No town and flat type has {min_pairs} or more repeat-sale pairs; the index is empty.")
+    else:
+        logger.info(f"Solved indices for {n_segments} segments.")
+
+    index.to_csv(output_path, index=False)
+    logger.success(f"Repeat-sales index saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    app()
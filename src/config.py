@@ -1,17 +1,28 @@
+import os
 from pathlib import Path
 
-from dotenv import load_dotenv
-from loguru import logger
-
-# Load environment variables from .env file if it exists
-load_dotenv()
-
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parents[1]
-logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
+
+# Load environment variables from .env file if it exists (python-dotenv is only
+# imported when there is one, since it is slow to import)
+if (PROJ_ROOT / ".env").exists():
+    from dotenv import load_dotenv
+
+    load_dotenv(PROJ_ROOT / ".env")
+
+# Logging (set in the environment or .env)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_ON_IMPORT = os.getenv("LOG_ON_IMPORT", "false").lower() in ("1", "true", "yes")
+
+if LOG_ON_IMPORT:
+    from loguru import logger
+
+    logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
 
 DATA_DIR = PROJ_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
+INTERIM_DATA_DIR = DATA_DIR / "interim"
 MODEL_DATA_DIR = DATA_DIR / "model"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 EXTERNAL_DATA_DIR = DATA_DIR / "external"
@@ -21,12 +32,4 @@ MODELS_DIR = PROJ_ROOT / "models"
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
 
-# If tqdm is installed, configure loguru with tqdm.write
-# https://github.com/Delgan/loguru/issues/135
-try:
-    from tqdm import tqdm
-
-    logger.remove(0)
-    logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
-except ModuleNotFoundError:
-    pass
+LOGS_DIR = PROJ_ROOT / "logs"
@@ -1,19 +1,25 @@
 from pathlib import Path
+
+from loguru import logger
 import typer
-import pandas as pd
 
-from src.config import PROCESSED_DATA_DIR, RAW_DATA_DIR, EXTERNAL_DATA_DIR
-from src.utils.logging import setup_logger
+from src.config import EXTERNAL_DATA_DIR, PROCESSED_DATA_DIR, RAW_DATA_DIR
+from src.outliers import OUTLIER_KEYS, flag_outliers
+from src.utils.lazy import lazy_import
+from src.utils.logging import increment, setup_logger, timed
+
+pd = lazy_import('pandas')
 
 app = typer.Typer()
-logger = setup_logger()
 
 @app.command()
+@timed("dataset.main")
 def main(
     processed_data: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
     location_data: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Locations.csv',
 ):
     '''Imports and cleans data'''
+    setup_logger()
     logger.info("Starting data processing...")
 
     # Import and concatenate raw datasets
@@ -27,6 +33,7 @@ def main(
     dfs = [pd.read_csv(RAW_DATA_DIR / file) for file in raw_files]
     df = pd.concat(dfs, ignore_index=True)
     logger.info("Loaded and merged raw datasets.")
+    increment("dataset.raw_rows", len(df))
 
     # Data cleaning and formatting
     df['flat_type'] = df['flat_type'].replace({'MULTI GENERATION': 'MULTI-GENERATION'})
@@ -83,6 +90,11 @@ def main(
     df.drop(columns='cum_index', inplace=True)
     logger.info("Inflation-adjusted prices calculated.")
 
+    # Flag price outliers within flat type, town and year
+    flag_outliers(df, 'infl_adj_price', OUTLIER_KEYS)
+    logger.info(f"Flagged {df['is_outlier'].sum()} outliers by {', '.join(OUTLIER_KEYS)}.")
+    increment("dataset.outliers", int(df['is_outlier'].sum()))
+
     # Geospatial
     # Modify planning_area entries for town == Central Area and town == Kallang/Whampoa
     town_mappings = {
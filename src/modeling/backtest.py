@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+from pathlib import Path
+import warnings
+
+from loguru import logger
+import typer
+
+from src.config import INTERIM_DATA_DIR, PROCESSED_DATA_DIR
+from src.modeling.forecast import (
+    WINDOWS,
+    build_panel,
+    fit_chunk,
+    load_processed,
+    recursive_forecast,
+    rolling_features,
+    stack_features,
+)
+from src.utils.lazy import lazy_import
+from src.utils.logging import setup_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+app = typer.Typer()
+
+# Arrays shared by every fold in a worker process, set once by _init_worker
+_FOLD_STATE = {}
+
+
+def cached_features(panel: pd.DataFrame, windows=WINDOWS, cache_dir: Path | None = INTERIM_DATA_DIR) -> np.ndarray:
+    '''Returns the stacked (date, feature, segment) feature array for the panel.
+
+    The features are lagged, so the row for month t only depends on data before t.
+    Rows up to any cutoff are therefore identical whether they are computed on the
+    full panel or on the panel truncated at that cutoff, and every fold can slice one
+    array instead of rebuilding it. The array is also cached on disk keyed by the
+    panel contents and windows, so reruns on unchanged data skip the computation.
+    '''
+    if cache_dir is None:
+        return stack_features(rolling_features(panel, windows))
+
+    key = hashlib.sha1(panel.to_numpy(dtype=float).tobytes())
+    key.update(repr((list(panel.columns), windows, len(panel))).encode())
+    cache_path = cache_dir / f'backtest_features_{key.hexdigest()[:16]}.npy'
+    if cache_path.exists():
+        logger.info(f"Loaded cached features from: {cache_path}")
+        return np.load(cache_path)
+
+    X = stack_features(rolling_features(panel, windows))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    np.save(cache_path, X)
+    return X
+
+
+def make_cutoffs(n_dates: int, horizon: int, n_folds: int, step: int = 1, min_train: int = 36) -> list[int]:
+    '''Row positions of the forecast origins, oldest first.
+
+    The last origin leaves `horizon` months of actuals after it; earlier origins are
+    spaced `step` months apart and must have at least `min_train` months before them.
+    '''
+    last = n_dates - 1 - horizon
+    cutoffs = [last - k * step for k in range(n_folds)]
+    return sorted(c for c in cutoffs if c >= min_train - 1)
+
+
+def _init_worker(X, y, windows, horizon, min_obs):
+    _FOLD_STATE.update(X=X, y=y, windows=windows, horizon=horizon, min_obs=min_obs)
+
+
+def _run_fold(cutoff: int) -> np.ndarray:
+    '''Trains on rows up to `cutoff` and returns (horizon, segment) forecast errors'''
+    X, y, horizon = _FOLD_STATE['X'], _FOLD_STATE['y'], _FOLD_STATE['horizon']
+    train_y = y[:cutoff + 1]
+    params = fit_chunk(X[:cutoff + 1], train_y, _FOLD_STATE['min_obs'])
+    preds = recursive_forecast(train_y, params, _FOLD_STATE['windows'], horizon)
+    return preds - y[cutoff + 1:cutoff + 1 + horizon]
+
+
+def run_folds(
+    X: np.ndarray,
+    y: np.ndarray,
+    cutoffs: list[int],
+    windows=WINDOWS,
+    horizon: int = 6,
+    min_obs: int = 24,
+    n_jobs: int | None = None,
+) -> np.ndarray:
+    '''Runs every fold and returns a (fold, horizon, segment) array of errors'''
+    n_jobs = n_jobs or os.cpu_count() or 1
+    init_args = (X, y, windows, horizon, min_obs)
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        return np.stack([_run_fold(c) for c in cutoffs])
+
+    # Workers receive the arrays once through the initializer; each task is just a cutoff
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init_args) as pool:
+        return np.stack(list(pool.map(_run_fold, cutoffs)))
+
+
+def error_metrics(errors: np.ndarray, actuals: np.ndarray, segments: pd.Index) -> pd.DataFrame:
+    '''Summarises (fold, horizon, segment) errors into one row per segment and horizon'''
+    # Segments with no scored folds give NaN metrics ("Mean of empty slice")
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        n_folds = np.isfinite(errors).sum(axis=0)
+        mae = np.nanmean(np.abs(errors), axis=0)
+        rmse = np.sqrt(np.nanmean(errors ** 2, axis=0))
+        mape = np.nanmean(np.abs(errors / actuals), axis=0) * 100
+        bias = np.nanmean(errors, axis=0)
+
+    horizon = errors.shape[1]
+    seg = segments.to_frame(index=False)
+    metrics = pd.concat(
+        [seg.assign(horizon=h + 1, n_folds=n_folds[h], mae=mae[h], rmse=rmse[h], mape=mape[h], bias=bias[h])
+         for h in range(horizon)],
+        ignore_index=True,
+    )
+    return metrics
+
+
+@app.command()
+def main(
+    input_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    metrics_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Backtest.csv',
+    horizon: int = 6,
+    n_folds: int = 60,
+    step: int = 1,
+    min_train: int = 36,
+    min_obs: int = 24,
+    n_jobs: int = typer.Option(None, help="Worker processes (defaults to all cores)"),
+    use_cache: bool = True,
+):
+    '''Walk-forward backtest of the per-segment forecasting model'''
+    setup_logger()
+    logger.info("Building segment panel...")
+    panel = build_panel(load_processed(input_path))
+    y = panel.to_numpy(dtype=float)
+    X = cached_features(panel, cache_dir=INTERIM_DATA_DIR if use_cache else None)
+
+    cutoffs = make_cutoffs(len(panel), horizon, n_folds, step, min_train)
+    if not cutoffs:
+        raise typer.BadParameter("No cutoffs leave enough training data; lower --min-train or --horizon.")
+    logger.info(
+        f"Running {len(cutoffs)} folds from {panel.index[cutoffs[0]]:%Y-%m} "
+        f"to {panel.index[cutoffs[-1]]:%Y-%m} over {panel.shape[1]} segments..."
+    )
+
+    errors = run_folds(X, y, cutoffs, horizon=horizon, min_obs=min_obs, n_jobs=n_jobs)
+    actuals = np.stack([y[c + 1:c + 1 + horizon] for c in cutoffs])
+    metrics = error_metrics(errors, actuals, panel.columns)
+    n_unscored = (metrics['n_folds'] == 0).sum()
+    if n_unscored:
+        logger.warning(f"{n_unscored} of {len(metrics)} segment x horizon rows have no scored folds.")
+
+    overall = metrics.groupby('horizon')[['mae', 'rmse', 'mape']].mean()
+    for h, row in overall.iterrows():
+        logger.info(f"h={h}: MAE {row['mae']:.0f}, RMSE {row['rmse']:.0f}, MAPE {row['mape']:.2f}%")
+
+    metrics.to_csv(metrics_path, index=False)
+    logger.success(f"Backtest metrics saved to: {metrics_path}")
+
+
+if __name__ == "__main__":
+    app()
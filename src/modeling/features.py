@@ -1,10 +1,10 @@
 from pathlib import Path
 
 from loguru import logger
-from tqdm import tqdm
 import typer
 
 from src.config import PROCESSED_DATA_DIR
+from src.utils.logging import setup_logger
 
 app = typer.Typer()
 
@@ -16,6 +16,9 @@ def main(
     output_path: Path = PROCESSED_DATA_DIR / "features.csv",
     # -----------------------------------------
 ):
+    from tqdm import tqdm
+
+    setup_logger()
     # ---- REPLACE THIS WITH YOUR OWN CODE ----
     logger.info("Generating features from dataset...")
     for i in tqdm(range(10), total=10):
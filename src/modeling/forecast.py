@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import warnings
+
+from loguru import logger
+import typer
+
+from src.config import MODELS_DIR, PROCESSED_DATA_DIR
+from src.utils.lazy import lazy_import
+from src.utils.logging import setup_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+app = typer.Typer()
+
+SEGMENT_COLS = ['town', 'flat_type']
+WINDOWS = (3, 9)
+
+
+def load_processed(input_path: Path) -> pd.DataFrame:
+    '''Reads the processed dataset written by `src.dataset`'''
+    return pd.read_csv(input_path, parse_dates=['date'])
+
+
+def build_panel(df: pd.DataFrame, segment_cols=SEGMENT_COLS, value_col='infl_adj_price') -> pd.DataFrame:
+    '''Pivots transactions into a date x segment panel of monthly mean prices.
+
+    Months without sales in a segment are left as NaN so that every column shares
+    the same contiguous monthly index.
+    '''
+    panel = df.pivot_table(index='date', columns=segment_cols, values=value_col, aggfunc='mean')
+    months = pd.date_range(panel.index.min(), panel.index.max(), freq='MS')
+    return panel.reindex(months).rename_axis('date')
+
+
+def rolling_features(panel: pd.DataFrame, windows=WINDOWS) -> dict[str, pd.DataFrame]:
+    '''Lagged moving averages for every segment at once.
+
+    Same features as the time-series notebook (`shift(1).rolling(w).mean()`), but
+    computed column-wise over the whole panel instead of one series at a time.
+    '''
+    lagged = panel.shift(1)
+    return {f'MA{w}': lagged.rolling(window=w).mean() for w in windows}
+
+
+def stack_features(features: dict[str, pd.DataFrame]) -> np.ndarray:
+    '''Stacks feature frames into a (date, feature, segment) array'''
+    return np.stack([f.to_numpy(dtype=float) for f in features.values()], axis=1)
+
+
+def fit_chunk(X: np.ndarray, y: np.ndarray, min_obs: int = 24) -> np.ndarray:
+    '''Fits one linear model per segment column.
+
+    X has shape (date, feature, segment) and y has shape (date, segment). Returns a
+    (segment, 1 + feature) array of intercepts and coefficients; segments with fewer
+    than `min_obs` complete rows are left as NaN.
+    '''
+    n_features, n_segments = X.shape[1], y.shape[1]
+    params = np.full((n_segments, n_features + 1), np.nan)
+    for j in range(n_segments):
+        Xj, yj = X[:, :, j], y[:, j]
+        ok = np.isfinite(yj) & np.isfinite(Xj).all(axis=1)
+        n = ok.sum()
+        if n < min_obs:
+            continue
+        A = np.column_stack([np.ones(n), Xj[ok]])
+        params[j], *_ = np.linalg.lstsq(A, yj[ok], rcond=None)
+    return params
+
+
+def fit_segments(X: np.ndarray, y: np.ndarray, min_obs: int = 24, n_jobs: int | None = None) -> np.ndarray:
+    '''Fits every segment, splitting the segment axis into chunks across a process pool'''
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_segments = y.shape[1]
+    if n_jobs == 1 or n_segments < 2:
+        return fit_chunk(X, y, min_obs)
+
+    # A few chunks per worker keeps the pool busy without paying IPC per segment
+    chunks = [c for c in np.array_split(np.arange(n_segments), n_jobs * 4) if len(c)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        results = pool.map(
+            fit_chunk,
+            [X[:, :, c] for c in chunks],
+            [y[:, c] for c in chunks],
+            [min_obs] * len(chunks),
+        )
+        return np.vstack(list(results))
+
+
+def recursive_forecast(history: np.ndarray, params: np.ndarray, windows=WINDOWS, horizon: int = 1) -> np.ndarray:
+    '''Forecasts `horizon` months ahead for all segments at once.
+
+    `history` is a (date, segment) array ending at the forecast origin. Each step's
+    prediction is appended to the history so the moving averages for the next step
+    include it. Months without sales are skipped when averaging, so sparse segments
+    only get a NaN forecast if a whole window is empty. Returns a (horizon, segment)
+    array.
+    '''
+    window = max(windows)
+    tail = history[-window:]
+    preds = np.empty((horizon, history.shape[1]))
+    for h in range(horizon):
+        with warnings.catch_warnings():
+            # All-NaN windows give NaN features, which is the intended result
+            warnings.simplefilter('ignore', RuntimeWarning)
+            feats = np.stack([np.nanmean(tail[-w:], axis=0) for w in windows], axis=1)
+        preds[h] = params[:, 0] + (params[:, 1:] * feats).sum(axis=1)
+        tail = np.vstack([tail[1:], preds[h]])
+    return preds
+
+
+def forecast_panel(
+    panel: pd.DataFrame,
+    windows=WINDOWS,
+    horizon: int = 1,
+    min_obs: int = 24,
+    n_jobs: int | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    '''Fits per-segment models on the panel and forecasts past its last month.
+
+    Returns the fitted parameters (one row per segment) and a long table of
+    forecasts with one row per segment and horizon.
+    '''
+    features = rolling_features(panel, windows)
+    X = stack_features(features)
+    y = panel.to_numpy(dtype=float)
+    params = fit_segments(X, y, min_obs, n_jobs)
+    preds = recursive_forecast(y, params, windows, horizon)
+
+    # Same complete-row count that fit_chunk compares with min_obs
+    params_df = pd.DataFrame(params, index=panel.columns, columns=['intercept', *features])
+    params_df['n_obs'] = (np.isfinite(y) & np.isfinite(X).all(axis=1)).sum(axis=0)
+
+    dates = pd.date_range(panel.index[-1], periods=horizon + 1, freq='MS')[1:]
+    segments = panel.columns.to_frame(index=False)
+    forecasts = pd.concat(
+        [segments.assign(date=d, horizon=h, forecast=preds[h - 1]) for h, d in enumerate(dates, start=1)],
+        ignore_index=True,
+    )
+    return params_df.reset_index(), forecasts
+
+
+@app.command()
+def main(
+    input_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    forecasts_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Forecasts.csv',
+    params_path: Path = MODELS_DIR / 'segment_forecast_params.csv',
+    horizon: int = 1,
+    min_obs: int = 24,
+    n_jobs: int = typer.Option(None, help="Worker processes (defaults to all cores)"),
+):
+    '''Forecasts inflation-adjusted prices for every town and flat type'''
+    setup_logger()
+    logger.info("Building segment panel...")
+    panel = build_panel(load_processed(input_path))
+    logger.info(f"Panel has {panel.shape[0]} months and {panel.shape[1]} segments.")
+
+    params, forecasts = forecast_panel(panel, horizon=horizon, min_obs=min_obs, n_jobs=n_jobs)
+    fitted = params['intercept'].notna().to_numpy()
+    missing = forecasts.loc[forecasts['horizon'] == 1, 'forecast'].isna().to_numpy() & fitted
+    logger.info(f"Fitted {fitted.sum()} of {len(params)} segments.")
+    if missing.any():
+        logger.warning(f"{missing.sum()} fitted segments have no forecast (no sales in the last {max(WINDOWS)} months).")
+
+    params.to_csv(params_path, index=False)
+    forecasts.to_csv(forecasts_path, index=False)
+    logger.success(f"Forecasts saved to: {forecasts_path} and {params_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,10 +1,10 @@
 from pathlib import Path
 
 from loguru import logger
-from tqdm import tqdm
 import typer
 
 from src.config import MODELS_DIR, PROCESSED_DATA_DIR
+from src.utils.logging import setup_logger
 
 app = typer.Typer()
 
@@ -17,6 +17,9 @@ def main(
     predictions_path: Path = PROCESSED_DATA_DIR / "test_predictions.csv",
     # -----------------------------------------
 ):
+    from tqdm import tqdm
+
+    setup_logger()
     # ---- REPLACE THIS WITH YOUR OWN CODE ----
     logger.info("Performing inference for model...")
     for i in tqdm(range(10), total=10):
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Annotated
+
+from loguru import logger
+import typer
+
+from src.config import PROCESSED_DATA_DIR
+from src.utils.lazy import lazy_import
+from src.utils.logging import setup_logger
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+app = typer.Typer()
+
+OUTLIER_KEYS = ['flat_type', 'town', 'year']
+
+
+def flag_outliers(
+    df: pd.DataFrame,
+    value_col: str = 'infl_adj_price',
+    keys: list[str] = OUTLIER_KEYS,
+    method: str = 'iqr',
+    iqr_k: float = 1.5,
+    z_max: float = 3.0,
+    flag_col: str = 'is_outlier',
+) -> pd.DataFrame:
+    '''Marks rows whose value is an outlier within their group.
+
+    Group statistics are computed in one grouped pass and broadcast back to the
+    rows through the group codes, so no per-group frames are built. With
+    method='iqr' a row is an outlier outside [Q1 - k*IQR, Q3 + k*IQR]; with
+    method='zscore' it is an outlier more than `z_max` standard deviations from
+    the group mean. Groups too small to have bounds are never flagged. The flag is
+    written to `flag_col` in place and the frame is returned.
+    '''
+    codes = df.groupby(keys, sort=True, observed=True, dropna=False).ngroup().to_numpy()
+    grouped = df[value_col].groupby(codes)
+
+    if method == 'iqr':
+        quartiles = grouped.quantile([0.25, 0.75]).unstack()
+        q1, q3 = quartiles[0.25].to_numpy()[codes], quartiles[0.75].to_numpy()[codes]
+        lower, upper = q1 - iqr_k * (q3 - q1), q3 + iqr_k * (q3 - q1)
+    elif method == 'zscore':
+        stats = grouped.agg(['mean', 'std'])
+        mean, std = stats['mean'].to_numpy()[codes], stats['std'].to_numpy()[codes]
+        lower, upper = mean - z_max * std, mean + z_max * std
+    else:
+        raise ValueError(f"Unknown outlier method: {method!r} (expected 'iqr' or 'zscore')")
+
+    values = df[value_col].to_numpy(dtype=float)
+    df[flag_col] = (values < lower) | (values > upper)
+    return df
+
+
+@app.command()
+def main(
+    input_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    output_path: Path = PROCESSED_DATA_DIR / 'ResaleFlatPrices-Processed.csv',
+    value_col: str = 'infl_adj_price',
+    keys: Annotated[
+        list[str] | None, typer.Option(help=f"Columns to group by (default: {', '.join(OUTLIER_KEYS)})")
+    ] = None,
+    method: str = typer.Option('iqr', help="'iqr' or 'zscore'"),
+    iqr_k: float = 1.5,
+    z_max: float = 3.0,
+):
+    '''Re-flags outliers in the processed dataset with different keys or rules'''
+    setup_logger()
+    keys = keys or OUTLIER_KEYS
+    df = pd.read_csv(input_path)
+    flag_outliers(df, value_col, keys, method, iqr_k, z_max)
+    logger.info(f"Flagged {np.count_nonzero(df['is_outlier'])} of {len(df)} rows as outliers by {keys}.")
+    df.to_csv(output_path, index=False)
+    logger.success(f"Dataset saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from src.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+class BitmapIndex:
+    '''Precomputed row bitmaps for filtering a fixed DataFrame.
+
+    Every value of each indexed column gets a bitmap of the rows holding it, packed
+    eight rows per byte with np.packbits. Filters are combined with bitwise OR
+    (values within a column) and AND (across columns) on the packed arrays, and
+    only the final bitmap is expanded into row positions. Columns listed in
+    `ranges` also get cumulative bitmaps ("value <= v"), so a range filter is two
+    bitmaps and one AND NOT regardless of how many values it spans.
+    '''
+
+    def __init__(self, df: pd.DataFrame, columns: list[str], ranges: list[str] | None = None):
+        self.n_rows = len(df)
+        self.values = {}
+        self.bitmaps = {}
+        self.cumulative = {}
+
+        for col in [*columns, *(ranges or [])]:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            packed = np.stack([np.packbits(codes == i) for i in range(len(uniques))])
+            self.values[col] = pd.Index(uniques)
+            self.bitmaps[col] = packed
+            if col in (ranges or []):
+                self.cumulative[col] = np.bitwise_or.accumulate(packed, axis=0)
+
+    def any_of(self, column: str, values) -> np.ndarray | None:
+        '''Bitmap of rows where `column` is any of `values`; None means no filter'''
+        if not values:
+            return None
+        idx = self.values[column].get_indexer(list(values))
+        idx = idx[idx >= 0]
+        if len(idx) == 0:
+            return np.zeros(self.bitmaps[column].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[column][idx], axis=0)
+
+    def between(self, column: str, low, high) -> np.ndarray | None:
+        '''Bitmap of rows where low <= `column` <= high, for columns indexed as ranges'''
+        values = self.values[column]
+        lo = values.searchsorted(low, side='left')
+        hi = values.searchsorted(high, side='right') - 1
+        if lo == 0 and hi == len(values) - 1:
+            return None
+        cumulative = self.cumulative[column]
+        if hi < lo:
+            return np.zeros(cumulative.shape[1], dtype=np.uint8)
+        bitmap = cumulative[hi]
+        return bitmap & ~cumulative[lo - 1] if lo > 0 else bitmap
+
+    def select(self, values: dict | None = None, ranges: dict | None = None) -> np.ndarray | None:
+        '''Row positions matching every filter, or None when nothing is filtered.
+
+        `values` maps columns to accepted values and `ranges` maps range columns to
+        (low, high) pairs; empty entries are ignored.
+        '''
+        bitmaps = [self.any_of(col, v) for col, v in (values or {}).items()]
+        bitmaps += [self.between(col, *bounds) for col, bounds in (ranges or {}).items() if bounds]
+        bitmaps = [b for b in bitmaps if b is not None]
+        if not bitmaps:
+            return None
+        combined = np.bitwise_and.reduce(np.stack(bitmaps), axis=0)
+        return np.flatnonzero(np.unpackbits(combined, count=self.n_rows))
@@ -0,0 +1,78 @@
+import statistics
+import subprocess
+import sys
+from typing import Annotated
+
+import typer
+
+from src.config import PROJ_ROOT
+
+app = typer.Typer()
+
+# Entry points of the CLI commands
+CLI_MODULES = [
+    'src.dataset',
+    'src.outliers',
+    'src.modeling.features',
+    'src.modeling.train',
+    'src.modeling.predict',
+    'src.modeling.forecast',
+    'src.modeling.backtest',
+    'src.analytics.comparables',
+    'src.analytics.lease_decay',
+    'src.analytics.repeat_sales',
+]
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    '''Parses `-X importtime` output into (module, self_us, cumulative_us) rows'''
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    '''Imports `module` in a fresh interpreter and returns its importtime rows'''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJ_ROOT, capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+@app.command()
+def main(
+    modules: Annotated[
+        list[str] | None, typer.Argument(help="Modules to time (defaults to all CLI modules)")
+    ] = None,
+    budget_ms: float = typer.Option(250.0, help="Maximum cumulative import time per module"),
+    repeat: int = typer.Option(5, help="Runs per module; the median is compared with the budget"),
+    top: int = typer.Option(8, help="Slowest imports to list for modules over budget"),
+):
+    '''Fails if importing any CLI module takes longer than the budget'''
+    over_budget = []
+    for module in modules or CLI_MODULES:
+        runs = [measure(module) for _ in range(repeat)]
+        total_ms = statistics.median(rows[-1][2] for rows in runs) / 1000
+        status = 'ok' if total_ms <= budget_ms else 'OVER'
+        typer.echo(f"{module:<32} {total_ms:8.1f} ms  {status}")
+
+        if total_ms > budget_ms:
+            over_budget.append(module)
+            slowest = sorted(runs[-1][:-1], key=lambda row: row[2], reverse=True)[:top]
+            for name, _, cumulative_us in slowest:
+                typer.echo(f"    {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+
+    if over_budget:
+        typer.echo(f"{len(over_budget)} module(s) over the {budget_ms:.0f} ms import budget.", err=True)
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,34 @@
+import importlib
+
+
+class _LazyModule:
+    '''Stands in for a module until one of its attributes is first used'''
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def __getattr__(self, attr):
+        # Only called for attributes missing from the instance dict, i.e. before the
+        # first load and for module-level __getattr__ names (e.g. numpy's `char`)
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self._lazy_name)
+            self.__dict__.update(vars(self._lazy_module))
+        return getattr(self._lazy_module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._lazy_module is not None else 'not loaded'
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+
+def lazy_import(name: str):
+    '''Returns a proxy that imports `name` on first attribute access.
+
+    Used for heavy dependencies (numpy, pandas, ...) so that importing a CLI module,
+    or running `--help`, doesn't pay for libraries the command may never touch.
+    The real import goes through the normal import system, so `sys.modules`,
+    pickling and worker processes see an ordinary module. Annotations that reference
+    the proxy need `from __future__ import annotations` so they aren't evaluated at
+    import time.
+    '''
+    return _LazyModule(name)
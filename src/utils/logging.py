@@ -1,10 +1,86 @@
-from loguru import logger
+from contextlib import contextmanager
+import json
 from pathlib import Path
 import sys
+import time
+
+from loguru import logger
+
+from src.config import LOG_LEVEL, LOGS_DIR
+
+
+def _is_metric(record):
+    return "metric" in record["extra"]
+
+
+def _is_message(record):
+    return "metric" not in record["extra"]
+
+
+def _json_line(record):
+    '''Formats a metric record as one compact JSON object per line'''
+    extra = record["extra"]
+    record["extra"]["_json"] = json.dumps({
+        "time": record["time"].isoformat(),
+        "metric": extra["metric"],
+        "kind": extra["kind"],
+        "value": extra["value"],
+        "tags": extra["tags"],
+    }, default=str)
+    return "{extra[_json]}\n"
 
-def setup_logger(log_path: Path = Path("logs/app.log")):
+
+def _console_sink():
+    # If tqdm is installed, write through tqdm.write so progress bars aren't broken
+    # https://github.com/Delgan/loguru/issues/135
+    try:
+        from tqdm import tqdm
+    except ModuleNotFoundError:
+        return sys.stderr
+    return lambda msg: tqdm.write(msg, end="")
+
+
+def setup_logger(
+    log_path: Path = LOGS_DIR / "app.log",
+    metrics_path: Path = LOGS_DIR / "metrics.jsonl",
+    level: str = LOG_LEVEL,
+):
+    '''Configures loguru sinks for the CLI commands and the dashboard.
+
+    File sinks are queued (`enqueue=True`) and written by a background thread, so
+    logging calls return without waiting on disk. Tracebacks with variable values
+    are only rendered into a separate error log. Metrics from `log_metric`,
+    `increment` and `timed` go to a JSON-lines file instead of the text logs.
+    '''
     log_path.parent.mkdir(parents=True, exist_ok=True)
+    metrics_path.parent.mkdir(parents=True, exist_ok=True)
     logger.remove()
-    logger.add(log_path, rotation="1 MB", backtrace=True, diagnose=True, level="INFO")
-    logger.add(sys.stderr, level="INFO", format="{time} | {level} | {message}")
+    logger.add(log_path, rotation="1 MB", level=level, enqueue=True,
+               backtrace=False, diagnose=False, filter=_is_message)
+    logger.add(log_path.with_name("error.log"), rotation="1 MB", level="ERROR", enqueue=True,
+               backtrace=True, diagnose=True, filter=_is_message)
+    logger.add(metrics_path, rotation="10 MB", level="DEBUG", enqueue=True,
+               format=_json_line, filter=_is_metric)
+    logger.add(_console_sink(), level=level, format="{time} | {level} | {message}",
+               backtrace=False, diagnose=False, filter=_is_message)
     return logger
+
+
+def log_metric(name: str, value: float, kind: str = "gauge", **tags):
+    '''Records a structured metric, e.g. `log_metric("rows", len(df), stage="clean")`'''
+    logger.bind(metric=name, kind=kind, value=value, tags=tags).debug(name)
+
+
+def increment(name: str, value: int = 1, **tags):
+    '''Records a counter increment'''
+    log_metric(name, value, "counter", **tags)
+
+
+@contextmanager
+def timed(name: str, **tags):
+    '''Records the wall time of a block (or decorated function) in milliseconds'''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        log_metric(name, round((time.perf_counter() - start) * 1000, 3), "timing_ms", **tags)
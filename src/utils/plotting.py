@@ -1,26 +1,27 @@
-from pathlib import Path
-import sys
+from src.utils.lazy import lazy_import
 
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from PIL import Image
-import io
-import os
+np = lazy_import('numpy')
 
-from src import config
 
-
-# Create a custom colourmap
+# Colours for the custom colourmap; matplotlib and plotly are imported by the
+# functions that use them so that importing this module stays cheap
 colours = ["#ff4500", "#faa272", "#ffdab9", "#0088ff", "#003376"]
-cmap = mcolors.LinearSegmentedColormap.from_list("", colours)
+
+
+def __getattr__(name):
+    # Build the custom colourmap on first access to `cmap`
+    if name == "cmap":
+        import matplotlib.colors as mcolors
+
+        global cmap
+        cmap = mcolors.LinearSegmentedColormap.from_list("", colours)
+        return cmap
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Function creation
 def multi_stop_gradient(n):
+    import matplotlib.colors as mcolors
+
     colours_rgb = [np.array(mcolors.to_rgb(colour)) for colour in colours]
     result = []
     
@@ -41,6 +42,9 @@ def multi_stop_gradient(n):
     return result
 
 def catplots(df, x_vars, group_by, title, agg_operation = 'count'):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     fig = make_subplots(rows=2, cols=1, row_heights=[2, 0.5])
     group_values = sorted(df[group_by].unique())
     n_groups = len(group_values)